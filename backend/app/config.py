@@ -2,6 +2,7 @@
 Configuration settings for TruthBot
 """
 import os
+from functools import cached_property
 from dotenv import load_dotenv
 from typing import List
 
@@ -19,6 +20,7 @@ class Settings:
     
     # Gemini API Configuration
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
     
     # File Upload Configuration
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
@@ -31,7 +33,7 @@ class Settings:
         "http://localhost:3000,http://127.0.0.1:3000,http://localhost:5500,http://127.0.0.1:5500,http://localhost:5501,http://127.0.0.1:5501,http://localhost:8080,http://127.0.0.1:8080,null"
     )
     
-    @property
+    @cached_property
     def allowed_origins_list(self) -> List[str]:
         """Get allowed origins as list"""
         origins = [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
@@ -46,6 +48,7 @@ settings = Settings()
 
 # Export commonly used settings
 GEMINI_API_KEY = settings.GEMINI_API_KEY
+GEMINI_MAX_CONCURRENCY = settings.GEMINI_MAX_CONCURRENCY
 MAX_FILE_SIZE = settings.MAX_FILE_SIZE
 ALLOWED_EXTENSIONS = settings.ALLOWED_EXTENSIONS
 UPLOAD_FOLDER = settings.UPLOAD_FOLDER
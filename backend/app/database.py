@@ -2,57 +2,159 @@
 Database module for storing conversation history
 """
 import sqlite3
-import json
-from datetime import datetime
+import orjson
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 # Database file location
 DB_PATH = Path(__file__).parent.parent / "conversations.db"
 
+# Per-connection tuning applied on every connect
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",  # ~64MB page cache
+    "PRAGMA mmap_size=268435456",  # 256MB
+    "PRAGMA busy_timeout=5000",  # wait up to 5s for locks instead of failing
+)
+
+# Number of connections kept open and shared across requests
+POOL_SIZE = 4
+
+CONVERSATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        content TEXT,
+        filename TEXT,
+        result_label TEXT,
+        result_confidence REAL,
+        result_explanation TEXT,
+        result_details TEXT,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+        CONSTRAINT valid_type CHECK (type IN ('text', 'file'))
+    )
+"""
+
+CONVERSATION_COLUMNS = (
+    "id", "type", "content", "filename",
+    "result_label", "result_confidence", "result_explanation", "result_details",
+    "created_at"
+)
+ALLOWED_FIELDS = frozenset(CONVERSATION_COLUMNS)
+
+# Columns needed for history list views (skips the large text columns)
+SUMMARY_FIELDS = ("id", "type", "filename", "result_label", "result_confidence", "created_at")
+
+SELECT_CONVERSATION_BY_ID_SQL = f"SELECT {', '.join(CONVERSATION_COLUMNS)} FROM conversations WHERE id = ?"
+
+# created_at is filled in by the column default
+INSERT_CONVERSATION_SQL = """
+    INSERT INTO conversations (
+        type, content, filename,
+        result_label, result_confidence, result_explanation, result_details
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
 
 class Database:
     """SQLite database handler for conversation history"""
     
     def __init__(self, db_path: str = None):
         self.db_path = db_path or str(DB_PATH)
+        
+        # Each in-memory connection is its own database, so only share one
+        pool_size = 1 if self._is_memory_db() else POOL_SIZE
+        self._pool: queue.Queue = queue.Queue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(self._create_connection())
+        
         self.init_database()
     
-    def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open a new configured database connection"""
+        # FastAPI runs sync calls in a threadpool, so connections move between threads
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
         conn.row_factory = sqlite3.Row  # Enable column access by name
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
         return conn
     
+    @contextmanager
+    def _conn(self):
+        """Borrow a connection from the pool, returning it when done"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.put(conn)
+    
+    def _is_memory_db(self) -> bool:
+        """Check whether the database lives in memory rather than on disk"""
+        return self.db_path == ":memory:" or self.db_path.startswith("file::memory:")
+    
     def init_database(self):
         """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Create conversations table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT NOT NULL,
-                content TEXT,
-                filename TEXT,
-                result_label TEXT,
-                result_confidence REAL,
-                result_explanation TEXT,
-                result_details TEXT,
-                created_at TEXT NOT NULL,
-                CONSTRAINT valid_type CHECK (type IN ('text', 'file'))
-            )
-        """)
-        
-        # Create index for faster queries
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            
+            # WAL mode is persistent in the database file, so it only needs to be
+            # set once; in-memory databases don't support it
+            if not self._is_memory_db():
+                cursor.execute("PRAGMA journal_mode=WAL")
+            
+            # Create conversations table
+            cursor.execute(CONVERSATIONS_TABLE_SQL.format(table="conversations"))
+            self._migrate_created_at_default(cursor)
+            
+            # Create index for faster queries
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_created_at 
+                ON conversations(created_at DESC)
+            """)
+            
+            # Covers history queries filtered by type
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_type_created_at
+                ON conversations(type, created_at DESC)
+            """)
+            
+            # Covers the label breakdown in get_stats
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_result_label
+                ON conversations(result_label) WHERE result_label IS NOT NULL
+            """)
+            
+            conn.commit()
+            
+            # Refresh planner statistics so the new indexes get picked up
+            cursor.execute("ANALYZE")
+    
+    def _migrate_created_at_default(self, cursor: sqlite3.Cursor):
+        """Rebuild tables created before created_at had a database-side default"""
+        columns = {row['name']: row for row in cursor.execute("PRAGMA table_info(conversations)")}
+        if columns['created_at']['dflt_value'] is not None:
+            return
+        
+        # SQLite can't alter a column default, so copy into a new table
+        cursor.execute("BEGIN IMMEDIATE")
+        row = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'conversations'").fetchone()
+        last_id = row['seq'] if row else 0
+        cursor.execute(CONVERSATIONS_TABLE_SQL.format(table="conversations_new"))
+        cursor.execute("INSERT INTO conversations_new SELECT * FROM conversations")
+        cursor.execute("DROP TABLE conversations")
+        cursor.execute("ALTER TABLE conversations_new RENAME TO conversations")
+        # Keep ids of previously deleted rows from being reused
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_created_at 
-            ON conversations(created_at DESC)
-        """)
-        
-        conn.commit()
-        conn.close()
+            UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'conversations'
+        """, (last_id,))
+        cursor.connection.commit()
     
     def save_conversation(
         self,
@@ -73,43 +175,82 @@ class Database:
         Returns:
             ID of the created conversation
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                INSERT_CONVERSATION_SQL,
+                self.build_conversation_row(conv_type, content, filename, result)
+            )
+            
+            conv_id = cursor.lastrowid
+            conn.commit()
+        
+        return conv_id
+    
+    def save_conversations_bulk(self, rows: List[tuple]) -> List[int]:
+        """
+        Save many conversations in a single transaction
+        
+        Args:
+            rows: Row tuples in insert column order (see build_conversation_row)
+        
+        Returns:
+            IDs of the created conversations, in input order
+        """
+        if not rows:
+            return []
+        
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(INSERT_CONVERSATION_SQL, rows)
+            # AUTOINCREMENT ids are contiguous within a single write transaction
+            last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.commit()
+        
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    
+    @staticmethod
+    def build_conversation_row(
+        conv_type: str,
+        content: Optional[str] = None,
+        filename: Optional[str] = None,
+        result: Dict = None
+    ) -> tuple:
+        """
+        Build an insert row tuple for a conversation
         
+        Args:
+            conv_type: Type of content ('text' or 'file')
+            content: Text content (for text analysis)
+            filename: Filename (for file analysis)
+            result: Analysis result dictionary
+        
+        Returns:
+            Tuple of column values matching INSERT_CONVERSATION_SQL
+        """
         # Extract result data
         result_label = result.get('label') if result else None
         result_confidence = result.get('confidence') if result else None
         result_explanation = result.get('explanation') if result else None
-        result_details = json.dumps(result.get('details', [])) if result else None
+        result_details = orjson.dumps(result.get('details', [])).decode() if result else None
         
-        cursor.execute("""
-            INSERT INTO conversations (
-                type, content, filename,
-                result_label, result_confidence, result_explanation, result_details,
-                created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        return (
             conv_type,
             content,
             filename,
             result_label,
             result_confidence,
             result_explanation,
-            result_details,
-            datetime.utcnow().isoformat()
-        ))
-        
-        conv_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return conv_id
+            result_details
+        )
     
     def get_conversations(
         self,
         limit: int = 50,
         offset: int = 0,
-        conv_type: Optional[str] = None
+        conv_type: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None
     ) -> List[Dict]:
         """
         Get conversations from the database
@@ -118,14 +259,18 @@ class Database:
             limit: Maximum number of conversations to return
             offset: Number of conversations to skip
             conv_type: Filter by type ('text' or 'file')
+            fields: Columns to return (defaults to all columns)
         
         Returns:
             List of conversation dictionaries
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        fields = fields or CONVERSATION_COLUMNS
+        # Column names can't be bound as parameters, so only allow known ones
+        unknown = set(fields) - ALLOWED_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown conversation fields: {', '.join(sorted(unknown))}")
         
-        query = "SELECT * FROM conversations"
+        query = f"SELECT {', '.join(fields)} FROM conversations"
         params = []
         
         if conv_type:
@@ -135,8 +280,8 @@ class Database:
         query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        with self._conn() as conn:
+            rows = conn.execute(query, params).fetchall()
         
         conversations = []
         for row in rows:
@@ -144,12 +289,11 @@ class Database:
             # Parse JSON details
             if conv.get('result_details'):
                 try:
-                    conv['result_details'] = json.loads(conv['result_details'])
-                except json.JSONDecodeError:
+                    conv['result_details'] = orjson.loads(conv['result_details'])
+                except orjson.JSONDecodeError:
                     conv['result_details'] = []
             conversations.append(conv)
         
-        conn.close()
         return conversations
     
     def get_conversation_by_id(self, conv_id: int) -> Optional[Dict]:
@@ -162,25 +306,20 @@ class Database:
         Returns:
             Conversation dictionary or None if not found
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM conversations WHERE id = ?", (conv_id,))
-        row = cursor.fetchone()
-        
-        if row:
-            conv = dict(row)
-            # Parse JSON details
-            if conv.get('result_details'):
-                try:
-                    conv['result_details'] = json.loads(conv['result_details'])
-                except json.JSONDecodeError:
-                    conv['result_details'] = []
-            conn.close()
-            return conv
-        
-        conn.close()
-        return None
+        with self._conn() as conn:
+            row = conn.execute(SELECT_CONVERSATION_BY_ID_SQL, (conv_id,)).fetchone()
+        
+        if not row:
+            return None
+        
+        conv = dict(row)
+        # Parse JSON details
+        if conv.get('result_details'):
+            try:
+                conv['result_details'] = orjson.loads(conv['result_details'])
+            except orjson.JSONDecodeError:
+                conv['result_details'] = []
+        return conv
     
     def delete_conversation(self, conv_id: int) -> bool:
         """
@@ -192,14 +331,11 @@ class Database:
         Returns:
             True if deleted, False if not found
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM conversations WHERE id = ?", (conv_id,))
-        deleted = cursor.rowcount > 0
-        
-        conn.commit()
-        conn.close()
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM conversations WHERE id = ?", (conv_id,))
+            deleted = cursor.rowcount > 0
+            conn.commit()
         
         return deleted
     
@@ -210,28 +346,32 @@ class Database:
         Returns:
             Dictionary with statistics
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) as total FROM conversations")
-        total = cursor.fetchone()['total']
-        
-        cursor.execute("""
-            SELECT type, COUNT(*) as count 
-            FROM conversations 
-            GROUP BY type
-        """)
-        type_counts = {row['type']: row['count'] for row in cursor.fetchall()}
-        
-        cursor.execute("""
-            SELECT result_label, COUNT(*) as count 
-            FROM conversations 
-            WHERE result_label IS NOT NULL
-            GROUP BY result_label
-        """)
-        label_counts = {row['result_label']: row['count'] for row in cursor.fetchall()}
-        
-        conn.close()
+        # One roundtrip: each row is tagged with the statistic it belongs to
+        with self._conn() as conn:
+            rows = conn.execute("""
+                SELECT 'total' AS kind, NULL AS key, COUNT(*) AS count
+                FROM conversations
+                UNION ALL
+                SELECT 'type', type, COUNT(*)
+                FROM conversations
+                GROUP BY type
+                UNION ALL
+                SELECT 'label', result_label, COUNT(*)
+                FROM conversations
+                WHERE result_label IS NOT NULL
+                GROUP BY result_label
+            """).fetchall()
+        
+        total = 0
+        type_counts = {}
+        label_counts = {}
+        for row in rows:
+            if row['kind'] == 'total':
+                total = row['count']
+            elif row['kind'] == 'type':
+                type_counts[row['key']] = row['count']
+            else:
+                label_counts[row['key']] = row['count']
         
         return {
             'total': total,
@@ -240,5 +380,16 @@ class Database:
         }
 
 
-# Singleton instance
-db = Database()
+# Singleton instance, created lazily by get_db()
+db: Optional[Database] = None
+_db_lock = threading.Lock()
+
+
+def get_db() -> Database:
+    """Get the shared Database instance, creating it on first use"""
+    global db
+    if db is None:
+        with _db_lock:
+            if db is None:
+                db = Database()
+    return db
@@ -1,8 +1,10 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.routes import analyze
 from app.routes import conversations
+from app.database import get_db
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -23,6 +25,16 @@ app.add_middleware(
 app.include_router(analyze.router, prefix="/api", tags=["Analysis"])
 app.include_router(conversations.router, prefix="/api", tags=["Conversations"])
 
+@app.on_event("startup")
+async def init_db():
+    """Open the conversation database off the event loop"""
+    await asyncio.to_thread(get_db)
+
+@app.on_event("shutdown")
+async def close_services():
+    """Close shared HTTP sessions"""
+    await analyze.analyzer_service.aclose()
+
 @app.get("/")
 async def root():
     return {
@@ -1,12 +1,14 @@
 """
 API routes for analysis endpoints
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Request
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
 from app.services.analyzer_service import AnalyzerService
-from app.models import AnalysisRequest, AnalysisResult, FileUploadResponse
+from app.models import AnalysisRequest, AnalysisResult
 from app.utils.file_handler import FileHandler
-import uuid
+import asyncio
 import json
+import uuid
 from pathlib import Path
 import logging
 
@@ -14,96 +16,101 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["analysis"])
+router = APIRouter()
 analyzer_service = AnalyzerService()
 file_handler = FileHandler()
 
+# File extensions analyzed with Gemini Vision
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif'}
+
 
-@router.post("/analyze")
-async def analyze(request: Request):
+@router.post("/analyze/text", response_model=AnalysisResult)
+async def analyze_text(request: AnalysisRequest):
     """
-    Unified analyze endpoint for both text and image
-    Handles both JSON (text) and FormData (image)
+    Analyze text content for misinformation
     
+    Args:
+        request: AnalysisRequest with content
+        
     Returns:
         AnalysisResult with analysis
     """
     try:
-        content_type = request.headers.get('content-type', '')
-        
-        if 'application/json' in content_type:
-            # Handle JSON payload for text analysis
-            body = await request.json()
-            request_type = body.get('type')
-            
-            if request_type == 'text':
-                content = body.get('content')
-                if not content:
-                    raise HTTPException(status_code=400, detail="Content is required for text analysis")
-                result = await analyzer_service.analyze_text(content)
-                return result
-            else:
-                raise HTTPException(status_code=400, detail="Type must be 'text' or 'image'")
-        
-        elif 'multipart/form-data' in content_type:
-            # Handle FormData for image analysis
-            form_data = await request.form()
-            request_type = form_data.get('type')
-            file = form_data.get('file')
-            
-            if request_type == 'image':
-                if not file:
-                    raise HTTPException(status_code=400, detail="File is required for image analysis")
-                
-                # Validate file
-                if not file_handler.is_allowed_file(file.filename):
-                    raise HTTPException(status_code=400, detail="File type not allowed")
-                
-                # Save file
-                file_id = str(uuid.uuid4())
-                file_path = file_handler.save_file(file, file_id)
-                
-                # Analyze the image
-                result = await analyzer_service.analyze_image(file_path)
-                
-                # Clean up file after analysis
-                try:
-                    file_handler.delete_file(file_id)
-                except:
-                    pass
-                
-                return result
-            else:
-                raise HTTPException(status_code=400, detail="Type must be 'text' or 'image'")
-        else:
-            raise HTTPException(status_code=400, detail="Invalid content type")
-    
-    except HTTPException:
-        raise
+        result = await analyzer_service.analyze_text(request.content)
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/analyze/text", response_model=AnalysisResult)
-async def analyze_text(request: AnalysisRequest):
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/analyze/text/stream")
+async def analyze_text_stream(request: AnalysisRequest):
     """
-    Analyze text content for misinformation
+    Analyze text content, streaming the analysis as Server-Sent Events
+    
+    Emits "chunk" events with analysis text as it is generated, then a
+    "result" event with the AnalysisResult, or an "error" event on failure.
     
     Args:
         request: AnalysisRequest with content
         
+    Returns:
+        text/event-stream response
+    """
+    async def events():
+        try:
+            async for kind, payload in analyzer_service.stream_text(request.content):
+                if kind == "result":
+                    yield _sse_event("result", payload.model_dump())
+                else:
+                    yield _sse_event("chunk", {"text": payload})
+        except Exception as e:
+            logger.error(f"Streaming analysis failed: {str(e)}")
+            yield _sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.post("/analyze/image", response_model=AnalysisResult)
+async def analyze_image(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """
+    Analyze an uploaded image for manipulation or misleading content
+    
+    Args:
+        background_tasks: Tasks run after the response is sent
+        file: Uploaded image file
+        
     Returns:
         AnalysisResult with analysis
     """
     try:
-        result = await analyzer_service.analyze_text(request.content)
+        # Validate file
+        if Path(file.filename).suffix.lower()[1:] not in IMAGE_EXTENSIONS:
+            raise HTTPException(status_code=400, detail="File type not allowed")
+        
+        # Save file
+        file_id = str(uuid.uuid4())
+        file_path = await asyncio.to_thread(file_handler.save_file, file, file_id)
+        
+        # Analyze the image
+        result = await analyzer_service.analyze_image(file_path)
+        
+        # Clean up file after the response is sent
+        background_tasks.add_task(file_handler.delete_file, file_id)
+        
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/analyze/upload", response_model=AnalysisResult)
-async def upload_and_analyze(file: UploadFile = File(...)):
+async def upload_and_analyze(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Upload a file and analyze it directly
     
@@ -125,7 +132,7 @@ async def upload_and_analyze(file: UploadFile = File(...)):
         # Save file
         file_id = str(uuid.uuid4())
         logger.info(f"   💾 Saving file with ID: {file_id}")
-        file_path = file_handler.save_file(file, file_id)
+        file_path = await asyncio.to_thread(file_handler.save_file, file, file_id)
         logger.info(f"   ✅ File saved to: {file_path}")
         
         # Get file extension
@@ -133,7 +140,7 @@ async def upload_and_analyze(file: UploadFile = File(...)):
         logger.info(f"   📄 File extension: {file_ext}")
         
         # Analyze the file directly
-        if file_ext in ['jpg', 'jpeg', 'png', 'gif']:
+        if file_ext in IMAGE_EXTENSIONS:
             logger.info(f"   🖼️ Analyzing as image...")
             result = await analyzer_service.analyze_image(file_path)
         else:
@@ -142,12 +149,9 @@ async def upload_and_analyze(file: UploadFile = File(...)):
         
         logger.info(f"   ✅ Analysis complete: {result.label} ({result.confidence})")
         
-        # Clean up file after analysis
-        try:
-            file_handler.delete_file(file_id)
-            logger.info(f"   🗑️ Temporary file cleaned up")
-        except:
-            pass
+        # Clean up file after the response is sent
+        background_tasks.add_task(file_handler.delete_file, file_id)
+        logger.info(f"   🗑️ Temporary file cleanup scheduled")
         
         return result
     except HTTPException:
@@ -158,8 +162,3 @@ async def upload_and_analyze(file: UploadFile = File(...)):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
-
-@router.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
@@ -1,20 +1,33 @@
 """
 Conversation history routes
 """
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List, Dict
-from app.database import db
+from app.database import Database, SUMMARY_FIELDS, get_db
 
 router = APIRouter()
 
 
+class AnalysisResultRecord(BaseModel):
+    """Schema for the analysis result stored with a conversation"""
+    label: Optional[str] = None
+    confidence: Optional[float] = None
+    explanation: Optional[str] = None
+    details: Optional[List[str]] = None
+
+
 class ConversationCreate(BaseModel):
     """Schema for creating a conversation"""
     type: str
     content: Optional[str] = None
     filename: Optional[str] = None
-    result: Optional[Dict] = None
+    result: Optional[AnalysisResultRecord] = None
+    
+    def result_dict(self) -> Optional[Dict]:
+        """Get the result as a plain dictionary for the database layer"""
+        return self.result.model_dump(exclude_none=True) if self.result else None
 
 
 class ConversationResponse(BaseModel):
@@ -31,14 +44,15 @@ class ConversationResponse(BaseModel):
 
 
 @router.post("/conversations", response_model=dict)
-async def create_conversation(conversation: ConversationCreate):
+async def create_conversation(conversation: ConversationCreate, db: Database = Depends(get_db)):
     """Save a new conversation to the database"""
     try:
-        conv_id = db.save_conversation(
+        conv_id = await asyncio.to_thread(
+            db.save_conversation,
             conv_type=conversation.type,
             content=conversation.content,
             filename=conversation.filename,
-            result=conversation.result
+            result=conversation.result_dict()
         )
         return {
             "success": True,
@@ -49,25 +63,57 @@ async def create_conversation(conversation: ConversationCreate):
         raise HTTPException(status_code=500, detail=f"Failed to save conversation: {str(e)}")
 
 
+@router.post("/conversations/bulk", response_model=dict)
+async def create_conversations_bulk(
+    conversations: List[ConversationCreate],
+    db: Database = Depends(get_db)
+):
+    """Save many conversations in a single transaction"""
+    try:
+        conv_ids = await asyncio.to_thread(db.save_conversations_bulk, [
+            db.build_conversation_row(
+                conv_type=conversation.type,
+                content=conversation.content,
+                filename=conversation.filename,
+                result=conversation.result_dict()
+            )
+            for conversation in conversations
+        ])
+        return {
+            "success": True,
+            "ids": conv_ids,
+            "message": f"{len(conv_ids)} conversations saved successfully"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save conversations: {str(e)}")
+
+
 @router.get("/conversations", response_model=List[dict])
 async def get_conversations(
     limit: int = 50,
     offset: int = 0,
-    type: Optional[str] = None
+    type: Optional[str] = None,
+    db: Database = Depends(get_db)
 ):
-    """Get conversation history"""
+    """Get conversation history (summary fields only; fetch by ID for full details)"""
     try:
-        conversations = db.get_conversations(limit=limit, offset=offset, conv_type=type)
+        conversations = await asyncio.to_thread(
+            db.get_conversations,
+            limit=limit,
+            offset=offset,
+            conv_type=type,
+            fields=SUMMARY_FIELDS
+        )
         return conversations
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve conversations: {str(e)}")
 
 
 @router.get("/conversations/{conv_id}", response_model=dict)
-async def get_conversation(conv_id: int):
+async def get_conversation(conv_id: int, db: Database = Depends(get_db)):
     """Get a specific conversation by ID"""
     try:
-        conversation = db.get_conversation_by_id(conv_id)
+        conversation = await asyncio.to_thread(db.get_conversation_by_id, conv_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         return conversation
@@ -78,10 +124,10 @@ async def get_conversation(conv_id: int):
 
 
 @router.delete("/conversations/{conv_id}", response_model=dict)
-async def delete_conversation(conv_id: int):
+async def delete_conversation(conv_id: int, db: Database = Depends(get_db)):
     """Delete a conversation"""
     try:
-        deleted = db.delete_conversation(conv_id)
+        deleted = await asyncio.to_thread(db.delete_conversation, conv_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Conversation not found")
         return {
@@ -95,10 +141,10 @@ async def delete_conversation(conv_id: int):
 
 
 @router.get("/conversations/stats/summary", response_model=dict)
-async def get_conversation_stats():
+async def get_conversation_stats(db: Database = Depends(get_db)):
     """Get conversation statistics"""
     try:
-        stats = db.get_stats()
+        stats = await asyncio.to_thread(db.get_stats)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve stats: {str(e)}")
@@ -2,26 +2,188 @@
 Main analysis orchestrator service
 Coordinates the analysis pipeline
 """
-from app.services.gemini_service import GeminiService
+from app.services.gemini_service import get_gemini_service
 from app.services.extractor_service import ExtractorService
 from app.services.search_service import SearchService
 from app.models import AnalysisResult
+import asyncio
 import json
 import re
 import os
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # optional, phrase matching falls back to substring scans
+    ahocorasick = None
+
+
+# Longest time to wait for web search before analyzing without sources
+SEARCH_BUDGET_SECONDS = float(os.getenv("SEARCH_BUDGET_SECONDS", "5"))
+
+# Number of leading content characters used as the search claim
+SEARCH_CLAIM_LENGTH = 200
+
+
+# Reliability indicator phrases, grouped by verdict
+_SPECULATIVE_PHRASES = (
+    'speculative', 'speculation', 'cannot be verified', 'unverifiable',
+    'no credible evidence', 'lacks any factual basis', 'unfounded',
+    'no evidence', 'lacks evidence', 'not based on facts',
+    'potentially defamatory', 'defamatory', 'rumor', 'rumors',
+    'innuendo', 'malicious', 'cannot be verified because',
+    'dismissing it as', 'unfounded speculation'
+)
+_FALSE_PHRASES = (
+    'potentially false', 'is false', 'appears false', 'likely false',
+    'misinformation', 'disinformation', 'fake', 'hoax', 'fabricated',
+    'not true', 'untrue', 'debunked', 'false claim', 'conspiracy'
+)
+_UNRELIABLE_PHRASES = (
+    'unreliable', 'not reliable', 'cannot be trusted', 'untrustworthy',
+    'no credible sources', 'spread rumors'
+)
+_DOUBTFUL_PHRASES = (
+    'doubtful', 'questionable', 'suspicious', 'misleading',
+    'partially true', 'mixed', 'some truth', 'lacks credibility',
+    'political bias', 'personal animosity', 'damage reputation'
+)
+_RELIABLE_PHRASES = (
+    'is reliable', 'appears reliable', 'highly reliable',
+    'is accurate', 'appears accurate', 'is credible',
+    'is true', 'this is true', 'factually correct',
+    'well-established fact', 'universally accepted', 'universally recognized',
+    'definitive answer', 'confirmed fact', 'verified fact',
+    'no factual errors', 'there are no factual errors',
+    'inherently verifiable', 'established scientific',
+    'fundamental aspect', 'basic fact', 'scientifically accurate',
+    'common knowledge', 'widely accepted'
+)
+_NEEDS_VERIFICATION_PHRASES = (
+    'needs verification', 'requires verification', 'unverified claim',
+    'insufficient evidence', 'unclear', 'need more context'
+)
+
+# Reliability verdicts as (phrases, label, confidence), highest priority first.
+# NEGATIVE indicators come first to avoid false positives.
+_RELIABILITY_RULES = (
+    (_SPECULATIVE_PHRASES, "needs_verification", 0.70),
+    (_FALSE_PHRASES, "potentially_false", 0.85),
+    (_UNRELIABLE_PHRASES, "potentially_false", 0.75),
+    (_DOUBTFUL_PHRASES, "doubtful", 0.65),
+    # POSITIVE indicators only apply if no negative one was found
+    (_RELIABLE_PHRASES, "reliable", 0.85),
+    (_NEEDS_VERIFICATION_PHRASES, "needs_verification", 0.55),
+)
+
+# Flattened (phrase, label, confidence, priority) table sorted by descending
+# priority, so the first phrase found decides the verdict
+_PHRASE_TABLE: Tuple[Tuple[str, str, float, int], ...] = tuple(
+    (phrase, label, confidence, len(_RELIABILITY_RULES) - rank)
+    for rank, (phrases, label, confidence) in enumerate(_RELIABILITY_RULES)
+    for phrase in phrases
+)
+_TOP_PRIORITY = _PHRASE_TABLE[0][3]
+
+
+def _build_phrase_automaton() -> Any:
+    """Compile every reliability phrase into one Aho-Corasick automaton"""
+    automaton = ahocorasick.Automaton()
+    for phrase, label, confidence, priority in _PHRASE_TABLE:
+        # The table is sorted by priority, so a repeated phrase keeps its strongest verdict
+        if phrase not in automaton:
+            automaton.add_word(phrase, (priority, label, confidence))
+    automaton.make_automaton()
+    return automaton
+
+
+# Matches all phrases in a single pass over the analysis when pyahocorasick is installed
+_PHRASE_AUTOMATON = _build_phrase_automaton() if ahocorasick else None
+
+# Section header keywords for reasons and verification tips
+_REASON_KEYWORDS = ('reason', 'finding', 'issue', 'concern', 'red flag', 'key claim')
+_TIP_KEYWORDS = ('recommendation', 'tip', 'suggestion', 'verification')
+
+# Bullet point marker, stripped once so numbers inside the text are kept
+_BULLET_PREFIX = re.compile(r'^(?:[-•*]|\d+\.)\s*')
+
+# Fallbacks when the analysis has no recognizable sections
+_DEFAULT_REASONS = ("Analysis completed. See details below.",)
+_DEFAULT_TIPS = (
+    "Verify claims through multiple reputable sources",
+    "Check the original source and publication date",
+    "Look for expert opinions and fact-checker assessments",
+    "Consider the context and potential biases"
+)
+
+
+def _truncate(text: str, limit: int, suffix: str = "...") -> str:
+    """Cut text to limit characters plus suffix, returning short text as-is"""
+    return text if len(text) <= limit else text[:limit] + suffix
+
+
+class _SectionCollector:
+    """Collects bullet points found under matching section headers"""
+    
+    def __init__(self, keywords: Tuple[str, ...], limit: int, ends_on_colon: bool = False, min_len: int = 10) -> None:
+        """
+        Initialize collector
+        
+        Args:
+            keywords: Lowercase header keywords that start the section
+            limit: Maximum number of bullets to collect
+            ends_on_colon: Whether a non-dash line containing ':' ends the section
+            min_len: Minimum bullet text length to keep (exclusive)
+        """
+        self.keywords = keywords
+        self.limit = limit
+        self.ends_on_colon = ends_on_colon
+        self.min_len = min_len
+        self.items: List[str] = []
+        self.done = False
+        self._in_section = False
+    
+    def feed(self, line: str, line_folded: str, bullet_text: Optional[str]) -> None:
+        """
+        Process one stripped line
+        
+        Args:
+            line: Stripped line
+            line_folded: Case-folded line
+            bullet_text: Line text without its bullet marker, or None if not a bullet
+        """
+        if any(keyword in line_folded for keyword in self.keywords):
+            self._in_section = True
+            return
+        if not self._in_section:
+            return
+        
+        if bullet_text is not None:
+            text = bullet_text.strip()
+            if len(text) > self.min_len:
+                self.items.append(text)
+                self.done = len(self.items) >= self.limit
+        
+        # Stop if we hit a new section
+        if self.ends_on_colon and ':' in line and not line.startswith('-'):
+            self._in_section = False
 
 
 class AnalyzerService:
     """Main service that orchestrates the analysis pipeline"""
     
-    def __init__(self):
+    def __init__(self) -> None:
         """Initialize services"""
-        self.gemini_service = GeminiService()
+        self.gemini_service = get_gemini_service()
         self.extractor_service = ExtractorService()
         self.search_service = SearchService()
         self.use_web_search = bool(os.getenv("SERPER_API_KEY", ""))
     
+    async def aclose(self) -> None:
+        """Release network resources held by the services"""
+        await self.search_service.aclose()
+        await self.gemini_service.aclose()
+    
     async def analyze_file(self, file_path: str, file_type: str) -> AnalysisResult:
         """
         Analyze a file through the complete pipeline
@@ -33,23 +195,41 @@ class AnalyzerService:
         Returns:
             AnalysisResult with findings
         """
-        # Step 1: Extract content
-        content = self.extractor_service.extract_text(file_path, file_type)
+        # Start web search early on the opening text when it can be read cheaply,
+        # so search overlaps with full extraction
+        search_task = None
+        if self.use_web_search:
+            claim = await asyncio.to_thread(
+                self.extractor_service.extract_prefix, file_path, file_type, SEARCH_CLAIM_LENGTH
+            )
+            if claim is not None:
+                print("[AnalyzerService] Searching web for verification...", flush=True)
+                search_task = asyncio.create_task(self._search_context(claim))
+        
+        # Step 1: Extract content (blocking file I/O and parsing, so run in a thread)
+        try:
+            content = await asyncio.to_thread(self.extractor_service.extract_text, file_path, file_type)
+        except BaseException:
+            if search_task:
+                search_task.cancel()
+            raise
         
         # Truncate very long content to avoid API limits (max ~15000 chars for analysis)
         max_content_length = 15000
         if len(content) > max_content_length:
             print(f"[AnalyzerService] Content truncated from {len(content)} to {max_content_length} chars")
-            content = content[:max_content_length] + "\n\n[... content truncated for analysis ...]"
+            content = _truncate(content, max_content_length, "\n\n[... content truncated for analysis ...]")
         
         print(f"[AnalyzerService] Step 2: Web search (enabled: {self.use_web_search})", flush=True)
         
         # Step 2: Web search for verification (if enabled)
         search_context = ""
-        if self.use_web_search:
+        if search_task:
+            search_context = await search_task
+            print(f"[AnalyzerService] Web search complete, context length: {len(search_context)}", flush=True)
+        elif self.use_web_search:
             print("[AnalyzerService] Searching web for verification...", flush=True)
-            search_results = await self.search_service.verify_claim(content[:200])
-            search_context = self.search_service.format_sources_for_analysis(search_results)
+            search_context = await self._search_context(content)
             print(f"[AnalyzerService] Web search complete, context length: {len(search_context)}", flush=True)
         
         print("[AnalyzerService] Step 3: Calling Gemini API...", flush=True)
@@ -75,10 +255,6 @@ class AnalyzerService:
         Returns:
             AnalysisResult with findings
         """
-        # Open image
-        with open(file_path, 'rb') as f:
-            image_data = f.read()
-        
         # Analyze with Gemini Vision
         analysis = await self.gemini_service.analyze_image(file_path)
         
@@ -100,8 +276,7 @@ class AnalyzerService:
         # Step 1: Web search for verification (if enabled)
         search_context = ""
         if self.use_web_search:
-            search_results = await self.search_service.verify_claim(content[:200])
-            search_context = self.search_service.format_sources_for_analysis(search_results)
+            search_context = await self._search_context(content)
         
         # Step 2: Analyze with Gemini (include search results)
         analysis = await self.gemini_service.analyze_text_with_sources(content, search_context)
@@ -111,6 +286,50 @@ class AnalyzerService:
         
         return result
     
+    async def stream_text(self, content: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Analyze raw text content, streaming the analysis as it is generated
+        
+        Args:
+            content: Text to analyze
+            
+        Yields:
+            ("chunk", text) for each piece of the analysis, then ("result", AnalysisResult)
+        """
+        # Step 1: Web search for verification (if enabled)
+        search_context = ""
+        if self.use_web_search:
+            search_context = await self._search_context(content)
+        
+        # Step 2: Stream the Gemini analysis through to the caller
+        chunks = []
+        async for chunk in self.gemini_service.stream_text_with_sources(content, search_context):
+            chunks.append(chunk)
+            yield "chunk", chunk
+        
+        # Step 3: Parse the complete analysis
+        yield "result", self._parse_analysis(content, ''.join(chunks), search_context)
+    
+    async def _search_context(self, content: str) -> str:
+        """
+        Search the web to verify content, within the search time budget
+        
+        Args:
+            content: Content being analyzed
+            
+        Returns:
+            Formatted search context, or empty string if search is too slow
+        """
+        try:
+            search_results = await asyncio.wait_for(
+                self.search_service.verify_claim(content[:SEARCH_CLAIM_LENGTH]),
+                timeout=SEARCH_BUDGET_SECONDS
+            )
+        except asyncio.TimeoutError:
+            print(f"[AnalyzerService] Web search exceeded {SEARCH_BUDGET_SECONDS}s, continuing without sources", flush=True)
+            return ""
+        return self.search_service.format_sources_for_analysis(search_results)
+    
     def _parse_analysis(self, content: str, analysis: str, search_context: str = "") -> AnalysisResult:
         """
         Parse Gemini analysis into structured format
@@ -124,156 +343,79 @@ class AnalyzerService:
             Structured AnalysisResult
         """
         # Parse the structured response
-        label, confidence = self._extract_reliability(analysis)
-        reasons = self._extract_reasons(analysis)
-        tips = self._extract_tips(analysis)
+        label, confidence, reasons, tips = self._parse_all(analysis)
         
         # Add search context to analysis details if available
-        full_analysis = analysis
-        if search_context:
-            full_analysis += "\n\n---\n📡 WEB VERIFICATION SOURCES:\n" + search_context
+        full_analysis = ''.join((
+            analysis, "\n\n---\n📡 WEB VERIFICATION SOURCES:\n", search_context
+        )) if search_context else analysis
         
-        return AnalysisResult(
+        # All fields are built here, so skip Pydantic validation
+        return AnalysisResult.model_construct(
             label=label,
             confidence=confidence,
-            content_preview=content[:300] + "..." if len(content) > 300 else content,
-            reasons=reasons if reasons else ["Analysis completed. See details below."],
-            tips=tips if tips else [
-                "Cross-reference with reputable news sources",
-                "Check the date and context of the information",
-                "Look for primary sources and official statements"
-            ],
+            content_preview=_truncate(content, 300),
+            reasons=reasons if reasons else list(_DEFAULT_REASONS),
+            tips=tips,
             analysis_details=full_analysis
         )
     
-    def _extract_reliability(self, analysis: str) -> Tuple[str, float]:
-        """Extract reliability label and confidence from analysis"""
-        analysis_lower = analysis.lower()
-        
-        # FIRST: Check for NEGATIVE indicators in the FULL text
-        # These should take priority to avoid false positives
-        
-        # Check for SPECULATIVE / UNVERIFIABLE content
-        if any(phrase in analysis_lower for phrase in [
-            'speculative', 'speculation', 'cannot be verified', 'unverifiable',
-            'no credible evidence', 'lacks any factual basis', 'unfounded',
-            'no evidence', 'lacks evidence', 'not based on facts',
-            'potentially defamatory', 'defamatory', 'rumor', 'rumors',
-            'innuendo', 'malicious', 'cannot be verified because',
-            'dismissing it as', 'unfounded speculation'
-        ]):
-            return "needs_verification", 0.70
-        
-        # Check for POTENTIALLY FALSE indicators
-        if any(phrase in analysis_lower for phrase in [
-            'potentially false', 'is false', 'appears false', 'likely false',
-            'misinformation', 'disinformation', 'fake', 'hoax', 'fabricated',
-            'not true', 'untrue', 'debunked', 'false claim', 'conspiracy'
-        ]):
-            return "potentially_false", 0.85
-        
-        # Check for UNRELIABLE indicators  
-        if any(phrase in analysis_lower for phrase in [
-            'unreliable', 'not reliable', 'cannot be trusted', 'untrustworthy',
-            'no credible sources', 'spread rumors'
-        ]):
-            return "potentially_false", 0.75
-        
-        # Check for DOUBTFUL indicators
-        if any(phrase in analysis_lower for phrase in [
-            'doubtful', 'questionable', 'suspicious', 'misleading',
-            'partially true', 'mixed', 'some truth', 'lacks credibility',
-            'political bias', 'personal animosity', 'damage reputation'
-        ]):
-            return "doubtful", 0.65
-        
-        # NOW check for POSITIVE indicators (only if no negative found)
-        
-        # Check for clearly RELIABLE content
-        if any(phrase in analysis_lower for phrase in [
-            'is reliable', 'appears reliable', 'highly reliable',
-            'is accurate', 'appears accurate', 'is credible',
-            'is true', 'this is true', 'factually correct',
-            'well-established fact', 'universally accepted', 'universally recognized',
-            'definitive answer', 'confirmed fact', 'verified fact',
-            'no factual errors', 'there are no factual errors', 
-            'inherently verifiable', 'established scientific',
-            'fundamental aspect', 'basic fact', 'scientifically accurate',
-            'common knowledge', 'widely accepted'
-        ]):
-            return "reliable", 0.85
-        
-        # Check for NEEDS VERIFICATION 
-        if any(phrase in analysis_lower for phrase in [
-            'needs verification', 'requires verification', 'unverified claim',
-            'insufficient evidence', 'unclear', 'need more context'
-        ]):
-            return "needs_verification", 0.55
+    def _parse_all(self, analysis: str) -> Tuple[str, float, List[str], List[str]]:
+        """
+        Extract reliability, reasons and verification tips from analysis
         
-        # Default fallback - if we can't determine, it needs verification
-        return "needs_verification", 0.50
-    
-    def _extract_reasons(self, analysis: str) -> List[str]:
-        """Extract reasons from analysis"""
-        reasons = []
-        lines = analysis.split('\n')
+        The analysis is case-folded once and its lines are walked once for both
+        the reasons and tips sections.
         
-        in_reasons_section = False
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check for section headers
-            if any(keyword in line.lower() for keyword in ['reason', 'finding', 'issue', 'concern', 'red flag', 'key claim']):
-                in_reasons_section = True
-                continue
-            
-            # Extract bullet points
-            if in_reasons_section and (line.startswith('-') or line.startswith('•') or line.startswith('*') or re.match(r'^\d+\.', line)):
-                reason = re.sub(r'^[-•*\d.]+\s*', '', line).strip()
-                if reason and len(reason) > 10:
-                    reasons.append(reason)
-                    if len(reasons) >= 5:
-                        break
+        Args:
+            analysis: Gemini analysis text
             
-            # Stop if we hit a new section
-            if in_reasons_section and ':' in line and not line.startswith('-'):
-                in_reasons_section = False
+        Returns:
+            Tuple of (label, confidence, reasons, tips)
+        """
+        # casefold() also normalizes non-ASCII case (e.g. 'ß' -> 'ss')
+        analysis_folded = analysis.casefold()
+        label, confidence = self._extract_reliability(analysis_folded)
         
-        return reasons[:5]
-    
-    def _extract_tips(self, analysis: str) -> List[str]:
-        """Extract verification tips from analysis"""
-        tips = []
-        lines = analysis.split('\n')
+        reasons = _SectionCollector(_REASON_KEYWORDS, limit=5, ends_on_colon=True)
+        tips = _SectionCollector(_TIP_KEYWORDS, limit=4)
         
-        in_tips_section = False
-        for line in lines:
+        # casefold() never adds or removes newlines, so the two line lists stay aligned
+        for line, line_folded in zip(analysis.split('\n'), analysis_folded.split('\n')):
             line = line.strip()
             if not line:
                 continue
             
-            # Check for section headers
-            if any(keyword in line.lower() for keyword in ['recommendation', 'tip', 'suggestion', 'verification']):
-                in_tips_section = True
-                continue
+            match = _BULLET_PREFIX.match(line)
+            bullet_text = line[match.end():] if match else None
             
-            # Extract bullet points
-            if in_tips_section and (line.startswith('-') or line.startswith('•') or line.startswith('*') or re.match(r'^\d+\.', line)):
-                tip = re.sub(r'^[-•*\d.]+\s*', '', line).strip()
-                if tip and len(tip) > 10:
-                    tips.append(tip)
-                    if len(tips) >= 4:
-                        break
+            if not reasons.done:
+                reasons.feed(line, line_folded, bullet_text)
+            if not tips.done:
+                tips.feed(line, line_folded, bullet_text)
+            
+            if reasons.done and tips.done:
+                break
         
         # Default tips if none found
-        if not tips:
-            tips = [
-                "Verify claims through multiple reputable sources",
-                "Check the original source and publication date",
-                "Look for expert opinions and fact-checker assessments",
-                "Consider the context and potential biases"
-            ]
-        
-        return tips[:4]
+        return label, confidence, reasons.items, tips.items or list(_DEFAULT_TIPS)
+    
+    def _extract_reliability(self, analysis_folded: str) -> Tuple[str, float]:
+        """Extract reliability label and confidence from case-folded analysis"""
+        # Highest-priority phrase present wins
+        if _PHRASE_AUTOMATON is not None:
+            best: Optional[Tuple[int, str, float]] = None
+            for _end, match in _PHRASE_AUTOMATON.iter(analysis_folded):
+                if best is None or match[0] > best[0]:
+                    best = match
+                    if best[0] == _TOP_PRIORITY:
+                        break
+            if best is not None:
+                return best[1], best[2]
+        else:
+            for phrase, label, confidence, _priority in _PHRASE_TABLE:
+                if phrase in analysis_folded:
+                    return label, confidence
+        
+        # Default fallback - if we can't determine, it needs verification
+        return "needs_verification", 0.50
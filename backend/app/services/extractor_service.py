@@ -114,3 +114,36 @@ class ExtractorService:
         
         print(f"[ExtractorService] Extracted {len(text)} characters")
         return text
+    
+    def extract_prefix(self, file_path: str, file_type: str, length: int) -> Optional[str]:
+        """
+        Extract only the first characters of a file's text, reading as little as possible
+        
+        Args:
+            file_path: Path to file
+            file_type: File extension
+            length: Number of characters wanted
+            
+        Returns:
+            Same text as extract_text(...)[:length], or None if the file
+            type can't be read partially
+        """
+        file_type = file_type.lower()
+        
+        try:
+            if file_type == 'pdf':
+                text = ""
+                with open(file_path, 'rb') as file:
+                    reader = PyPDF2.PdfReader(file)
+                    for page in reader.pages:
+                        text += page.extract_text()
+                        if len(text) >= length:
+                            break
+                return text[:length]
+            elif file_type == 'txt':
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    return file.read(length)
+        except Exception as e:
+            print(f"[ExtractorService] Could not extract prefix: {str(e)}")
+        
+        return None
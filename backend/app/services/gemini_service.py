@@ -3,31 +3,216 @@ Gemini AI integration service
 Handles communication with Google Gemini API
 """
 import google.generativeai as genai
-from app.config import GEMINI_API_KEY
+from google.api_core import exceptions as google_exceptions
+from app.config import GEMINI_API_KEY, GEMINI_MAX_CONCURRENCY
+from app.services.llm_cache import LLMCache, cache_key, create_backend
 from PIL import Image
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import io
+import random
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+# Bump when prompts change so cached responses for old prompts are not reused
+PROMPT_VERSION = 1
+
+# Instructions shared by every sourced text analysis request
+FACT_CHECK_INSTRUCTIONS = """You are a fact-checking and misinformation detection expert. Analyze the following content for accuracy, misinformation, bias, and reliability. The content and any web search results are given after these instructions.
+
+Please provide a structured analysis with the following sections:
+
+## Reliability Assessment
+[State CLEARLY if the content is: "reliable", "doubtful", "needs_verification", or "potentially_false"]
+[Be definitive in your assessment based on available evidence]
+
+## Key Findings
+- [List the main claims or statements found]
+- [Note any factual errors or misleading information]
+- [Identify potential biases]
+
+## Reasons for Assessment
+- [Explain why you rated it this way]
+- [Reference any fact-check sources if available]
+- [List specific red flags or positive indicators]
+
+## Verification Tips
+- [Suggest how to verify this information]
+- [Recommend sources to cross-reference]
+
+IMPORTANT: 
+- For simple factual questions (like "is blue a color"), clearly state it is RELIABLE if true.
+- For speculative claims without evidence, state it NEEDS VERIFICATION or is POTENTIALLY FALSE.
+- Use the web search results to inform your assessment when available.
+
+Be specific and helpful in your analysis."""
+
+# Instructions for image manipulation analysis
+VISION_PROMPT = """You are an expert at detecting manipulated, misleading, or fake images. Analyze this image thoroughly.
+
+Please provide a structured analysis with:
+
+## Image Description
+[Describe what the image shows]
+
+## Reliability Assessment
+[State if the image appears: reliable, doubtful, needs_verification, or potentially_false]
+
+## Signs of Manipulation
+- [List any signs of digital manipulation, editing, or AI generation]
+- [Note any inconsistencies in lighting, shadows, or proportions]
+
+## Context Concerns
+- [Identify if the image could be misleading when taken out of context]
+- [Note any concerning elements]
+
+## Verification Tips
+- [Suggest how to verify this image's authenticity]
+- [Recommend reverse image search or other tools]
+
+Be thorough and specific in your analysis."""
+
+# Largest image dimensions sent to the vision model
+VISION_MAX_SIZE = (1024, 1024)
+
+# Retry policy for rate limiting (429) and server-side (5xx) API errors
+_RETRYABLE_ERRORS = (google_exceptions.TooManyRequests, google_exceptions.ServerError)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 0.5  # seconds, doubled on each attempt
 
 
 class GeminiService:
     """Service for interacting with Gemini API"""
     
-    def __init__(self):
-        """Initialize Gemini with API key"""
+    def __init__(self, cache: Optional[LLMCache] = None):
+        """
+        Initialize Gemini with API key
+        
+        Args:
+            cache: Response cache (defaults to one chosen by create_backend)
+        """
         if GEMINI_API_KEY:
             genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
         self.vision_model = genai.GenerativeModel('gemini-2.0-flash')
-        self._executor = ThreadPoolExecutor(max_workers=2)
+        self.cache = cache or LLMCache(create_backend("llm:"), ttl=3600)
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the concurrency limit for API calls on the running event loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+            self._semaphores[loop] = semaphore
+        return semaphore
     
-    def _generate_sync(self, prompt: str) -> str:
-        """Synchronous call to Gemini API"""
-        import sys
+    async def _generate_content(self, model: genai.GenerativeModel, contents: Any) -> str:
+        """
+        Call a Gemini model within the concurrency limit, retrying transient errors
+        
+        Args:
+            model: Model to call
+            contents: Prompt or list of prompt parts
+            
+        Returns:
+            Response text
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with self._get_semaphore():
+                    response = await model.generate_content_async(contents)
+                return response.text
+            except _RETRYABLE_ERRORS as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                await self._backoff(attempt, e)
+    
+    @staticmethod
+    async def _backoff(attempt: int, error: Exception) -> None:
+        """Wait before retrying a transient API error (exponential backoff with jitter)"""
+        # Callers sleep here without holding a concurrency slot
+        delay = RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+        print(f"[GeminiService] {type(error).__name__}, retrying in {delay:.1f}s", flush=True)
+        await asyncio.sleep(delay)
+    
+    async def _stream_to_queue(self, prompt: str, queue: "asyncio.Queue[Optional[str]]") -> None:
+        """
+        Stream a Gemini response into a queue within the concurrency limit
+        
+        The response is drained as fast as Gemini produces it, so the concurrency
+        slot is released when generation ends rather than when the reader catches up.
+        Transient errors are retried until the first chunk arrives.
+        
+        Args:
+            prompt: Prompt to send
+            queue: Queue receiving response text chunks
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            started = False
+            try:
+                async with self._get_semaphore():
+                    response = await self.model.generate_content_async(prompt, stream=True)
+                    async for chunk in response:
+                        started = True
+                        queue.put_nowait(chunk.text)
+                return
+            except _RETRYABLE_ERRORS as e:
+                # Retrying after text was delivered would repeat it
+                if started or attempt == MAX_RETRIES:
+                    raise
+                await self._backoff(attempt, e)
+    
+    async def _generate(self, prompt: str) -> str:
+        """Call the Gemini API without blocking the event loop"""
         print("[GeminiService] Sending request to Gemini API...", flush=True)
-        response = self.model.generate_content(prompt)
+        result = await self._generate_content(self.model, prompt)
         print("[GeminiService] Response received from Gemini API", flush=True)
-        return response.text
+        return result
+    
+    async def aclose(self):
+        """Release cache connections"""
+        await self.cache.aclose()
+    
+    @staticmethod
+    def _encode_image(image_path: str) -> Dict[str, Any]:
+        """Decode, downscale and re-encode an image as JPEG for the vision model"""
+        with Image.open(image_path) as img:
+            # Let JPEG decode at reduced resolution before resampling
+            img.draft('RGB', VISION_MAX_SIZE)
+            img.thumbnail(VISION_MAX_SIZE, Image.LANCZOS)
+            
+            # JPEG has no alpha channel, so flatten transparency onto white
+            if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+                rgba = img.convert('RGBA')
+                img = Image.new('RGB', rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel('A'))
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            
+            # Encoding here keeps the SDK from encoding the image on the event loop
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=90)
+        return {"mime_type": "image/jpeg", "data": buffer.getvalue()}
+    
+    async def _generate_vision(self, image_path: str) -> str:
+        """Call the Gemini vision API on a downscaled copy of the image"""
+        print("[GeminiService] Analyzing image...", flush=True)
+        # Image decoding and encoding are CPU-bound, so only that part runs in a thread
+        image = await asyncio.to_thread(self._encode_image, image_path)
+        result = await self._generate_content(self.vision_model, [VISION_PROMPT, image])
+        print("[GeminiService] Image analysis complete", flush=True)
+        return result
+    
+    @staticmethod
+    def _file_digest(file_path: str) -> str:
+        """Hash file contents in chunks"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            while chunk := f.read(64 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
     
     async def analyze_text(self, content: str) -> str:
         """
@@ -64,9 +249,14 @@ Please provide a structured analysis with the following sections:
 
 Be specific and helpful in your analysis."""
         
+        key = cache_key(self.model.model_name, PROMPT_VERSION, "analyze_text", content)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Run in thread to avoid blocking
-            result = await asyncio.to_thread(self._generate_sync, prompt)
+            result = await self._generate(prompt)
+            await self.cache.set(key, result)
             return result
         except Exception as e:
             print(f"[GeminiService] Error: {str(e)}", flush=True)
@@ -83,6 +273,24 @@ Be specific and helpful in your analysis."""
         Returns:
             Analysis result from Gemini
         """
+        prompt = self._sourced_prompt(content, search_context)
+        
+        key = cache_key(self.model.model_name, PROMPT_VERSION, "analyze_text_with_sources", content, search_context)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            result = await self._generate(prompt)
+            await self.cache.set(key, result)
+            return result
+        except Exception as e:
+            print(f"[GeminiService] Error: {str(e)}", flush=True)
+            return f"Analysis could not be completed: {str(e)}. Please verify the content manually through trusted sources."
+    
+    @staticmethod
+    def _sourced_prompt(content: str, search_context: str) -> str:
+        """Build the fact-check prompt, including web search context if available"""
         # Build prompt with search context if available
         search_section = ""
         if search_context:
@@ -93,45 +301,53 @@ Be specific and helpful in your analysis."""
 Use the above web search results to help verify the claim. If fact-checking sources found information about this claim, use that to inform your assessment.
 """
         
-        prompt = f"""You are a fact-checking and misinformation detection expert. Analyze the following content for accuracy, misinformation, bias, and reliability.
+        # Static instructions go first so every request shares the same prompt prefix
+        return f"""{FACT_CHECK_INSTRUCTIONS}
 
 CONTENT TO ANALYZE:
 {content}
-{search_section}
-Please provide a structured analysis with the following sections:
-
-## Reliability Assessment
-[State CLEARLY if the content is: "reliable", "doubtful", "needs_verification", or "potentially_false"]
-[Be definitive in your assessment based on available evidence]
-
-## Key Findings
-- [List the main claims or statements found]
-- [Note any factual errors or misleading information]
-- [Identify potential biases]
-
-## Reasons for Assessment
-- [Explain why you rated it this way]
-- [Reference any fact-check sources if available]
-- [List specific red flags or positive indicators]
-
-## Verification Tips
-- [Suggest how to verify this information]
-- [Recommend sources to cross-reference]
-
-IMPORTANT: 
-- For simple factual questions (like "is blue a color"), clearly state it is RELIABLE if true.
-- For speculative claims without evidence, state it NEEDS VERIFICATION or is POTENTIALLY FALSE.
-- Use the web search results to inform your assessment when available.
-
-Be specific and helpful in your analysis."""
+{search_section}"""
+    
+    async def stream_text_with_sources(self, content: str, search_context: str = "") -> AsyncIterator[str]:
+        """
+        Analyze text content using Gemini with web search context, streaming the response
+        
+        Args:
+            content: Text to analyze
+            search_context: Web search results for verification
+            
+        Yields:
+            Pieces of the analysis text as Gemini generates them
+        """
+        prompt = self._sourced_prompt(content, search_context)
+        
+        # Shares cache entries with analyze_text_with_sources
+        key = cache_key(self.model.model_name, PROMPT_VERSION, "analyze_text_with_sources", content, search_context)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
         
+        print("[GeminiService] Streaming request to Gemini API...", flush=True)
+        queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        producer = asyncio.create_task(self._stream_to_queue(prompt, queue))
+        # None marks the end of the stream, whether generation finished or failed
+        producer.add_done_callback(lambda _: queue.put_nowait(None))
+        
+        chunks = []
         try:
-            # Run in thread to avoid blocking
-            result = await asyncio.to_thread(self._generate_sync, prompt)
-            return result
-        except Exception as e:
-            print(f"[GeminiService] Error: {str(e)}", flush=True)
-            return f"Analysis could not be completed: {str(e)}. Please verify the content manually through trusted sources."
+            while (text := await queue.get()) is not None:
+                chunks.append(text)
+                yield text
+            # Re-raise any generation error
+            await producer
+        finally:
+            # Stop generating if the reader went away early
+            producer.cancel()
+        print("[GeminiService] Stream from Gemini API complete", flush=True)
+        
+        # Only complete responses are cached
+        await self.cache.set(key, ''.join(chunks))
     
     async def analyze_image(self, image_path: str) -> str:
         """
@@ -143,40 +359,32 @@ Be specific and helpful in your analysis."""
         Returns:
             Analysis result from Gemini
         """
-        prompt = """You are an expert at detecting manipulated, misleading, or fake images. Analyze this image thoroughly.
-
-Please provide a structured analysis with:
-
-## Image Description
-[Describe what the image shows]
-
-## Reliability Assessment
-[State if the image appears: reliable, doubtful, needs_verification, or potentially_false]
-
-## Signs of Manipulation
-- [List any signs of digital manipulation, editing, or AI generation]
-- [Note any inconsistencies in lighting, shadows, or proportions]
-
-## Context Concerns
-- [Identify if the image could be misleading when taken out of context]
-- [Note any concerning elements]
-
-## Verification Tips
-- [Suggest how to verify this image's authenticity]
-- [Recommend reverse image search or other tools]
-
-Be thorough and specific in your analysis."""
-        
-        def _analyze_image_sync():
-            print("[GeminiService] Analyzing image...", flush=True)
-            img = Image.open(image_path)
-            response = self.vision_model.generate_content([prompt, img])
-            print("[GeminiService] Image analysis complete", flush=True)
-            return response.text
-        
         try:
-            result = await asyncio.to_thread(_analyze_image_sync)
+            # Key on image contents since uploads get a fresh filename each time
+            image_digest = await asyncio.to_thread(self._file_digest, image_path)
+            key = cache_key(self.vision_model.model_name, PROMPT_VERSION, "analyze_image", image_digest)
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+            
+            result = await self._generate_vision(image_path)
+            await self.cache.set(key, result)
             return result
         except Exception as e:
             print(f"[GeminiService] Image error: {str(e)}", flush=True)
             return f"Image analysis could not be completed: {str(e)}. Please verify the image manually."
+
+
+# Singleton instance, created lazily by get_gemini_service()
+gemini_service: Optional[GeminiService] = None
+_gemini_service_lock = threading.Lock()
+
+
+def get_gemini_service() -> GeminiService:
+    """Get the shared GeminiService instance, creating it on first use"""
+    global gemini_service
+    if gemini_service is None:
+        with _gemini_service_lock:
+            if gemini_service is None:
+                gemini_service = GeminiService()
+    return gemini_service
@@ -0,0 +1,190 @@
+"""
+LLM response cache
+Lets repeated prompts skip the round trip to the Gemini API
+Uses Redis when REDIS_URL is set, otherwise an in-process cache
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Protocol
+
+
+def cache_key(*parts: Any) -> str:
+    """
+    Build a stable cache key from the parts of a request
+    
+    Args:
+        parts: JSON-serializable values identifying the request (model, prompt, ...)
+    
+    Returns:
+        Hex SHA-256 digest of the parts
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    """Storage interface used by LLMCache"""
+    
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+    
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        ...
+    
+    async def delete(self, key: str) -> None:
+        ...
+    
+    async def clear(self) -> None:
+        ...
+    
+    async def aclose(self) -> None:
+        ...
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry expiry"""
+    
+    def __init__(self, max_entries: int = 1024):
+        """Initialize an empty cache holding at most max_entries items"""
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        """Store a value that expires after ttl seconds"""
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        
+        # Evict least recently used entries
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def delete(self, key: str) -> None:
+        """Remove a value if present"""
+        self._entries.pop(key, None)
+    
+    async def clear(self) -> None:
+        """Remove all values"""
+        self._entries.clear()
+    
+    async def aclose(self) -> None:
+        """Nothing to release for an in-process cache"""
+
+
+class RedisBackend:
+    """Redis cache shared across workers and surviving restarts"""
+    
+    def __init__(self, url: str, prefix: str):
+        """
+        Initialize backend
+        
+        Args:
+            url: Redis connection URL
+            prefix: Namespace prepended to every key (e.g. "llm:")
+        """
+        # Only needed when REDIS_URL is configured
+        import redis.asyncio as redis
+        
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a value, or None if missing, undecodable or Redis is unreachable"""
+        try:
+            raw = await self._redis.get(self.prefix + key)
+            return json.loads(raw) if raw is not None else None
+        except Exception as e:
+            print(f"[LLMCache] Redis get failed: {str(e)}", flush=True)
+            return None
+    
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        """Store a JSON-serialized value that expires after ttl seconds"""
+        try:
+            await self._redis.set(self.prefix + key, json.dumps(value, ensure_ascii=False), ex=ttl)
+        except Exception as e:
+            print(f"[LLMCache] Redis set failed: {str(e)}", flush=True)
+    
+    async def delete(self, key: str) -> None:
+        """Remove a value if present"""
+        await self._redis.delete(self.prefix + key)
+    
+    async def clear(self) -> None:
+        """Remove all values under this backend's prefix"""
+        keys = [key async for key in self._redis.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self._redis.delete(*keys)
+    
+    async def aclose(self) -> None:
+        """Close the Redis connection pool"""
+        await self._redis.aclose()
+
+
+def create_backend(prefix: str, max_entries: int = 1024) -> CacheBackend:
+    """
+    Create the cache backend for a namespace
+    
+    Args:
+        prefix: Redis key namespace (e.g. "llm:")
+        max_entries: Size of the in-process cache used without Redis
+    
+    Returns:
+        RedisBackend when REDIS_URL is set, otherwise MemoryBackend
+    """
+    redis_url = os.getenv("REDIS_URL", "")
+    if redis_url:
+        return RedisBackend(redis_url, prefix)
+    return MemoryBackend(max_entries=max_entries)
+
+
+class LLMCache:
+    """Exact-match response cache with hit/miss counters"""
+    
+    def __init__(self, backend: CacheBackend, ttl: int = 3600):
+        """
+        Initialize cache
+        
+        Args:
+            backend: Storage backend
+            ttl: Seconds before a cached response expires
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None on a miss"""
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    async def set(self, key: str, value: Any) -> None:
+        """Store a value for the configured TTL"""
+        await self.backend.set(key, value, self.ttl)
+    
+    async def clear(self) -> None:
+        """Drop all cached values"""
+        await self.backend.clear()
+    
+    async def aclose(self) -> None:
+        """Release backend connections"""
+        await self.backend.aclose()
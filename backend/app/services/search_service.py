@@ -2,20 +2,65 @@
 Web Search Service for fact verification
 Uses Serper.dev API for Google search results
 """
-import aiohttp
 import asyncio
+import httpx
 import os
 from typing import List, Dict, Optional
 from app.config import settings
+from app.services.llm_cache import LLMCache, cache_key, create_backend
+
+
+# Domains treated as fact-checking sources (subdomains included)
+_FACT_CHECK_DOMAINS = frozenset({
+    'snopes.com', 'politifact.com', 'factcheck.org', 'reuters.com',
+    'apnews.com', 'bbc.com', 'bbc.co.uk', 'wikipedia.org'
+})
+_FACT_CHECK_SUFFIXES = tuple('.' + domain for domain in _FACT_CHECK_DOMAINS)
+
+# Bump when the verify_claim queries change so results from old queries are not reused
+SEARCH_STRATEGY_VERSION = 2
 
 
 class SearchService:
     """Service for web search to verify claims"""
     
-    def __init__(self):
-        """Initialize search service"""
+    def __init__(self, cache: Optional[LLMCache] = None):
+        """
+        Initialize search service
+        
+        Args:
+            cache: Search result cache (defaults to one chosen by create_backend)
+        """
         self.api_key = os.getenv("SERPER_API_KEY", "")
         self.base_url = "https://google.serper.dev/search"
+        # Fixed locale so results aren't duplicated across regional variants
+        self.country = os.getenv("SERPER_GL", "us")
+        self.language = os.getenv("SERPER_HL", "en")
+        # Clients are bound to the event loop they were created on
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self.cache = cache or LLMCache(create_backend("serper:", max_entries=1024), ttl=3600)
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            # HTTP/2 multiplexes concurrent searches over one TLS connection
+            client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(8.0, connect=3.0),
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+            )
+            self._clients[loop] = client
+        return client
+    
+    async def aclose(self):
+        """Close all shared HTTP clients and cache connections"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+        await self.cache.aclose()
     
     async def search(self, query: str, num_results: int = 5) -> List[Dict]:
         """
@@ -38,40 +83,36 @@ class SearchService:
         
         payload = {
             "q": query,
-            "num": num_results
+            "num": num_results,
+            "gl": self.country,
+            "hl": self.language
         }
         
         try:
-            timeout = aiohttp.ClientTimeout(total=10)  # 10 second timeout
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    self.base_url,
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._parse_results(data)
-                    else:
-                        print(f"Search API error: {response.status}")
-                        return []
-        except aiohttp.ClientError as e:
-            print(f"Search connection error: {e}")
-            return []
-        except asyncio.TimeoutError:
+            client = self._get_client()
+            response = await client.post(self.base_url, headers=headers, json=payload)
+            if response.status_code == 200:
+                return self._parse_results(response.json(), num_results)
+            else:
+                print(f"Search API error: {response.status_code}")
+                return []
+        except httpx.TimeoutException:
             print("Search timeout - continuing without web search")
             return []
+        except httpx.HTTPError as e:
+            print(f"Search connection error: {e}")
+            return []
         except Exception as e:
             print(f"Search error: {e}")
             return []
     
-    def _parse_results(self, data: Dict) -> List[Dict]:
-        """Parse search results from Serper API response"""
+    def _parse_results(self, data: Dict, num_results: int = 5) -> List[Dict]:
+        """Parse up to num_results organic results (plus any direct answers) from a Serper API response"""
         results = []
         
         # Parse organic results
         organic = data.get("organic", [])
-        for item in organic[:5]:
+        for item in organic[:num_results]:
             results.append({
                 "title": item.get("title", ""),
                 "link": item.get("link", ""),
@@ -116,6 +157,11 @@ class SearchService:
         except:
             return url
     
+    def _is_fact_check_source(self, source: str) -> bool:
+        """Check if a result domain belongs to a fact-checking source"""
+        source = source.lower()
+        return source in _FACT_CHECK_DOMAINS or source.endswith(_FACT_CHECK_SUFFIXES)
+    
     async def verify_claim(self, claim: str) -> Dict:
         """
         Verify a claim by searching for it
@@ -126,28 +172,41 @@ class SearchService:
         Returns:
             Dict with search results and verification context
         """
-        # Create search queries
-        queries = [
-            f'"{claim}" fact check',
-            f'{claim} true or false',
-            claim
-        ]
+        # Resubmissions often differ only in case or whitespace
+        normalized_claim = ' '.join(claim.lower().split())[:200]
+        key = cache_key(
+            "verify_claim", SEARCH_STRATEGY_VERSION, self.country, self.language, normalized_claim
+        )
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        verification = await self._verify_claim_uncached(claim)
+        # Don't cache failed or empty searches
+        if verification["total_results"]:
+            await self.cache.set(key, verification)
+        return verification
+    
+    async def _verify_claim_uncached(self, claim: str) -> Dict:
+        """Search for a claim and group results by source type"""
+        # One combined query usually covers both the fact-check and true/false angles
+        results = await self.search(f'{claim} fact check OR "true or false"', num_results=6)
+        
+        # Only spend a second API call when too few fact-checks came back
+        if sum(self._is_fact_check_source(r.get("source", "")) for r in results) < 2:
+            seen_links = {r.get("link") for r in results}
+            for result in await self.search(f'"{claim}" fact check', num_results=3):
+                if result.get("link") not in seen_links:
+                    results.append(result)
         
         all_results = []
         fact_check_results = []
-        
-        for query in queries[:2]:  # Limit API calls
-            results = await self.search(query, num_results=3)
-            for result in results:
-                # Check if it's from a fact-checking source
-                source = result.get("source", "").lower()
-                if any(fc in source for fc in [
-                    "snopes", "politifact", "factcheck.org", 
-                    "reuters", "ap news", "bbc", "wikipedia"
-                ]):
-                    fact_check_results.append(result)
-                else:
-                    all_results.append(result)
+        for result in results:
+            # Check if it's from a fact-checking source
+            if self._is_fact_check_source(result.get("source", "")):
+                fact_check_results.append(result)
+            else:
+                all_results.append(result)
         
         return {
             "fact_check_sources": fact_check_results[:3],
@@ -9,6 +9,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Size of each read when streaming uploads to disk
+CHUNK_SIZE = 64 * 1024
+
 
 class FileHandler:
     """Handles file operations"""
@@ -50,14 +53,20 @@ class FileHandler:
         
         logger.info(f"Saving file to: {file_path}")
         
-        # Read and save file
+        # Stream file to disk in chunks so memory use stays bounded
+        total_size = 0
         with open(file_path, 'wb') as f:
-            contents = file.file.read()
-            logger.info(f"Read {len(contents)} bytes from uploaded file")
-            if len(contents) > MAX_FILE_SIZE:
-                raise Exception("File size exceeds maximum allowed")
-            f.write(contents)
+            while chunk := file.file.read(CHUNK_SIZE):
+                total_size += len(chunk)
+                if total_size > MAX_FILE_SIZE:
+                    break
+                f.write(chunk)
+        
+        if total_size > MAX_FILE_SIZE:
+            file_path.unlink()
+            raise Exception("File size exceeds maximum allowed")
         
+        logger.info(f"Read {total_size} bytes from uploaded file")
         logger.info(f"File saved successfully: {file_path}")
         return str(file_path)
     